@@ -1,12 +1,18 @@
-import requests
+import aiohttp
+import asyncio
 import re
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
-import json
-from bs4 import BeautifulSoup
+import orjson
+import hashlib
+from selectolax.lexbor import LexborHTMLParser
 import time
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 
 load_dotenv()
 
@@ -22,10 +28,28 @@ if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 QUERY = 'site:.sg "restaurant" ("contact us" OR "contact" OR "email" OR "phone" OR "address")'
 NUM_RESULTS = 10  # per request
+CSE_CONCURRENCY = 5  # simultaneous CSE page requests
+CSE_MAX_RETRIES = 3  # retries on 429/5xx with exponential backoff
+SCRAPE_CONCURRENCY = 20  # simultaneous website scrapes
+SCRAPE_RATE_PER_HOST = 1.0  # requests per second to any single host
+MAX_HTML_BYTES = 65536  # read at most this much (decoded) HTML per page
+GEMINI_BATCH_SIZE = 10  # restaurants per Gemini prompt
+GEMINI_CONCURRENCY = 5  # simultaneous Gemini requests
+GEMINI_REQUESTS_PER_MINUTE = 15  # stay under the API's per-minute quota
+GEMINI_MAX_RETRIES = 3  # retries on 429/5xx with exponential backoff
 FOLDER_NAME = "exported_data"
 JSON_FILE = "restaurant_details.json"
+JSONL_FILE = "restaurants.jsonl"  # append-only log, source of truth between runs
 EXCEL_FILE = "restaurant_emails.xlsx"
+PARQUET_FILE = "restaurants.parquet"
+PARQUET_BATCH_SIZE = 64  # rows per RecordBatch in the streamed export
+EXPORT_EXCEL = os.getenv("EXPORT_EXCEL", "").lower() in ("1", "true", "yes")  # optional human-readable copy
 STATE_FILE = "scraping_state.json"
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br'
+}
 
 # ========================
 # CREATE FOLDER IF NOT EXISTS
@@ -34,9 +58,56 @@ if not os.path.exists(FOLDER_NAME):
     os.makedirs(FOLDER_NAME)
 
 json_path = os.path.join(FOLDER_NAME, JSON_FILE)
+jsonl_path = os.path.join(FOLDER_NAME, JSONL_FILE)
 excel_path = os.path.join(FOLDER_NAME, EXCEL_FILE)
+parquet_path = os.path.join(FOLDER_NAME, PARQUET_FILE)
 state_path = os.path.join(FOLDER_NAME, STATE_FILE)
 
+# ========================
+# REGEX PATTERNS (compiled once)
+# ========================
+EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+PHONE_RE = re.compile(r"\+?\d[\d\s\-]{7,}\d")
+# The phone branch may not end where an email local part continues, or it would
+# swallow the leading digits of an address such as "6123 4567 91234567@resto.sg"
+COMBO_RE = re.compile(r"(?P<email>[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})"
+                      r"|(?P<phone>\+?\d[\d\s\-]{7,}\d)(?![a-zA-Z0-9._%+-]*@)")
+EMAIL_STRICT_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+EMAIL_CLEAN_RE = re.compile(r'[^a-zA-Z0-9@._-]')
+PHONE_CLEAN_RE = re.compile(r'[^\d+\-\s]')
+DIGITS_RE = re.compile(r'[^\d]')
+HAS_DIGIT_RE = re.compile(r'\d')
+NAME_SUFFIX_RE = re.compile(r'\s*[|\-].*$')
+WS_RE = re.compile(r'\s+')
+CONTACT_RE = re.compile(r'contact|email|phone', re.I)
+PROTO_RE = re.compile(r'^https?://(www\.)?')
+DOMAIN_SPLIT_RE = re.compile(r'[./]')
+DOMAIN_CLEAN_RE = re.compile(r'[^a-zA-Z0-9]')
+FNAME_RE = re.compile(r'[<>:"/\\|?*]')
+
+# str.translate deletion tables for the Latin-1 range, derived from the
+# cleaning regexes above so both paths strip exactly the same characters
+def _deletion_table(pattern):
+    return str.maketrans('', '', ''.join(ch for ch in map(chr, range(256)) if pattern.match(ch)))
+
+EMAIL_TRANS = _deletion_table(EMAIL_CLEAN_RE)
+PHONE_TRANS = _deletion_table(PHONE_CLEAN_RE)
+DIGITS_TRANS = _deletion_table(DIGITS_RE)
+
+GEMINI_RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,  # 429
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+)
+
+RESTAURANT_SCHEMA = pa.schema([
+    ("name", pa.string()),
+    ("website", pa.string()),
+    ("email", pa.string()),
+    ("phone", pa.string()),
+])
+
 # ========================
 # VALIDATION FUNCTIONS
 # ========================
@@ -50,8 +121,14 @@ def validate_email(email):
     """Validate email format"""
     if email == "-":
         return True
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    # Cheap structural rejects before running the regex
+    at = email.find('@')
+    if at < 1:
+        return False
+    dot = email.rfind('.')
+    if dot < at + 2 or dot > len(email) - 3:
+        return False
+    return bool(EMAIL_STRICT_RE.match(email))
 
 def validate_url(url):
     """Validate URL format"""
@@ -61,13 +138,13 @@ def validate_url(url):
 
 def sanitize_filename(filename):
     """Remove dangerous characters from filename"""
-    return re.sub(r'[<>:"/\\|?*]', '_', filename)
+    return FNAME_RE.sub('_', filename)
 
 # ========================
 # FUNCTIONS
 # ========================
-def fetch_cse_results(query, start=1):
-    """Fetch search results with validation"""
+async def fetch_cse_results(session, query, start=1):
+    """Fetch search results with validation; returns None if the request failed"""
     if not query or len(query.strip()) < 3:
         raise ValueError("Query must be at least 3 characters")
     if start < 1 or start > 100:
@@ -83,30 +160,81 @@ def fetch_cse_results(query, start=1):
     }
     
     try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        for attempt in range(CSE_MAX_RETRIES + 1):
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                retry = response.status in (429, 500, 502, 503, 504) and attempt < CSE_MAX_RETRIES
+                if not retry:
+                    response.raise_for_status()
+                    data = await response.json(loads=orjson.loads)
+                    break
+            
+            # Exponential backoff on rate limiting / server errors
+            delay = 2 ** attempt
+            print(f"[WARNING] CSE returned {response.status} for start={start}, retrying in {delay}s")
+            await asyncio.sleep(delay)
         
         if 'error' in data:
             raise Exception(f"API Error: {data['error']['message']}")
             
         print(f"[INFO] Total results available: {data.get('searchInformation', {}).get('totalResults', '0')}")
         return data.get("items", [])
-    except requests.exceptions.RequestException as e:
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         print(f"[ERROR] Network error: {e}")
-        return []
+        return None
     except Exception as e:
         print(f"[ERROR] API error: {e}")
-        return []
+        return None
+
+async def fetch_cse_pages(query, start=1):
+    """Fetch every remaining page of the 100-result CSE window concurrently"""
+    starts = range(start, 101, NUM_RESULTS)
+    sem = asyncio.Semaphore(CSE_CONCURRENCY)
+    
+    async with aiohttp.ClientSession() as session:
+        async def bounded_fetch(page_start):
+            async with sem:
+                return await fetch_cse_results(session, query, start=page_start)
+        
+        return await asyncio.gather(*[bounded_fetch(s) for s in starts])
 
 def extract_emails(text):
-    emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
+    # Cheap prescan: no '@' means the regex cannot match
+    if '@' not in text:
+        return ["-"]
+    emails = EMAIL_RE.findall(text)
     return emails if emails else ["-"]
 
 def extract_phones(text):
-    phones = re.findall(r"\+?\d[\d\s\-]{7,}\d", text)
+    if not HAS_DIGIT_RE.search(text):
+        return ["-"]
+    phones = PHONE_RE.findall(text)
     return phones if phones else ["-"]
 
+def extract_contacts(text):
+    """Extract emails and phones in a single regex pass
+
+    >>> extract_contacts("Tel: 6123 4567 91234567@resto.sg")
+    (['91234567@resto.sg'], ['6123 4567'])
+    >>> extract_contacts("Hotline 6123-4567 - 88info@x.sg")
+    (['88info@x.sg'], ['6123-4567'])
+    >>> extract_contacts("61234567@example.sg")
+    (['61234567@example.sg'], ['-'])
+    """
+    if '@' not in text:
+        return ["-"], extract_phones(text)
+    emails, phones = [], []
+    for m in COMBO_RE.finditer(text):
+        if m.lastgroup == 'email':
+            emails.append(m.group())
+        else:
+            phones.append(m.group())
+    return emails or ["-"], phones or ["-"]
+
+def strip_chars(text, table, pattern):
+    """Delete characters via str.translate, using the regex only for non-ASCII leftovers"""
+    text = text.translate(table)
+    return text if text.isascii() else pattern.sub('', text)
+
 def clean_email(email_str):
     """Clean and validate email addresses"""
     if not email_str or email_str == "-":
@@ -117,7 +245,7 @@ def clean_email(email_str):
     
     for email in emails:
         # Remove extra text and clean
-        email = re.sub(r'[^a-zA-Z0-9@._-]', '', email).strip()
+        email = strip_chars(email, EMAIL_TRANS, EMAIL_CLEAN_RE).strip()
         if len(email) > 5 and validate_email(email):
             cleaned.append(email.lower())
     
@@ -135,8 +263,8 @@ def clean_phone(phone_str):
     
     for phone in phones:
         # Remove whitespace and invalid chars
-        phone = re.sub(r'[^\d+\-\s]', '', phone).strip()
-        digits_only = re.sub(r'[^\d]', '', phone)
+        phone = strip_chars(phone, PHONE_TRANS, PHONE_CLEAN_RE).strip()
+        digits_only = strip_chars(phone, DIGITS_TRANS, DIGITS_RE)
         # Validate phone length (7-15 digits)
         if 7 <= len(digits_only) <= 15:
             cleaned.append(phone)
@@ -149,11 +277,11 @@ def extract_domain_name(url):
     """Extract domain name from URL"""
     try:
         # Remove protocol and www
-        domain = re.sub(r'^https?://(www\.)?', '', url)
+        domain = PROTO_RE.sub('', url)
         # Extract domain between start and first dot or slash
-        domain = re.split(r'[./]', domain)[0]
+        domain = DOMAIN_SPLIT_RE.split(domain)[0]
         # Clean domain name
-        domain = re.sub(r'[^a-zA-Z0-9]', '', domain)
+        domain = DOMAIN_CLEAN_RE.sub('', domain)
         return domain.capitalize() if domain else "Unknown"
     except:
         return "Unknown"
@@ -161,8 +289,8 @@ def extract_domain_name(url):
 def clean_name(name, website=""):
     """Clean name and use domain if name is generic"""
     # Remove common suffixes and clean
-    name = re.sub(r'\s*[|\-].*$', '', name)  # Remove everything after | or -
-    name = re.sub(r'\s+', ' ', name).strip()  # Normalize spaces
+    name = NAME_SUFFIX_RE.sub('', name)  # Remove everything after | or -
+    name = WS_RE.sub(' ', name).strip()  # Normalize spaces
     
     # If name is generic, use domain name
     generic_names = ['contact us', 'contact', 'home', 'enquiries', 'about us', 'enquiry']
@@ -172,76 +300,254 @@ def clean_name(name, website=""):
     
     return name if name else "Unknown Restaurant"
 
-def scrape_website_content(url):
+class HostRateLimiter:
+    """Per-host token bucket so concurrent scraping stays polite to each server"""
+    def __init__(self, rate=1.0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # host -> (tokens, last_refill)
+        self._locks = {}
+
+    async def acquire(self, host):
+        async with self._locks.setdefault(host, asyncio.Lock()):
+            tokens, last = self._buckets.get(host, (self.burst, time.monotonic()))
+            now = time.monotonic()
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                await asyncio.sleep((1 - tokens) / self.rate)
+                now = time.monotonic()
+                tokens = 1
+            self._buckets[host] = (tokens - 1, now)
+
+    def backoff(self, host, seconds):
+        """Hold off further requests to host (e.g. from a Retry-After header)"""
+        self._buckets[host] = (-seconds * self.rate, time.monotonic())
+
+def parse_website_content(content):
+    """Extract contact-related text from raw HTML"""
+    tree = LexborHTMLParser(content)
+    
+    # Remove script and style elements
+    tree.strip_tags(["script", "style"])
+    
+    # Focus on contact-related sections, stopping after the first 3 matches
+    contact_sections = []
+    for node in tree.css('div, section, footer'):
+        if CONTACT_RE.search(node.text(deep=False)):
+            contact_sections.append(node)
+            if len(contact_sections) == 3:
+                break
+    
+    text_content = ''
+    if contact_sections:
+        for section in contact_sections:
+            text_content += section.text() + ' '
+    elif tree.root is not None:
+        # Fallback to full page text (limited)
+        text_content = tree.root.text()[:5000]  # First 5000 chars only
+    
+    return text_content.strip()
+
+async def read_limited(response, max_bytes):
+    """Read at most max_bytes of the body, trimming a tag cut off at the limit"""
+    content = bytearray()
+    async for chunk in response.content.iter_any():
+        content += chunk
+        if len(content) >= max_bytes:
+            break
+    else:
+        return bytes(content)
+    
+    content = content[:max_bytes]
+    cut = content.rfind(b'<')
+    if cut > 0 and b'>' not in content[cut:]:
+        content = content[:cut]
+    return bytes(content)
+
+async def scrape_website_content(session, url, limiter=None):
     """Scrape website content with validation and error handling"""
     if not validate_url(url):
         print(f"[WARNING] Invalid URL: {url}")
         return ""
     
+    host = urlparse(url).netloc
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
-        }
-        response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
-        response.raise_for_status()
-        
-        # Check content type
-        content_type = response.headers.get('content-type', '').lower()
-        if 'text/html' not in content_type:
-            print(f"[WARNING] Non-HTML content: {content_type}")
-            return ""
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Focus on contact-related sections
-        contact_sections = soup.find_all(['div', 'section', 'footer'], 
-                                       string=re.compile(r'contact|email|phone', re.I))
-        
-        text_content = ''
-        if contact_sections:
-            for section in contact_sections[:3]:  # Limit to first 3 matches
-                text_content += section.get_text() + ' '
-        else:
-            # Fallback to full page text (limited)
-            text_content = soup.get_text()[:5000]  # First 5000 chars only
+        if limiter:
+            await limiter.acquire(host)
+        async with session.get(url, headers=SCRAPE_HEADERS, timeout=aiohttp.ClientTimeout(total=15),
+                               allow_redirects=True) as response:
+            retry_after = response.headers.get('Retry-After', '')
+            if limiter and response.status in (429, 503) and retry_after.isdigit():
+                limiter.backoff(host, int(retry_after))
+            response.raise_for_status()
+            
+            # Check content type
+            content_type = response.headers.get('content-type', '').lower()
+            if 'text/html' not in content_type:
+                print(f"[WARNING] Non-HTML content: {content_type}")
+                return ""
+            
+            content = await read_limited(response, MAX_HTML_BYTES)
         
-        return text_content.strip()
-    except requests.exceptions.Timeout:
+        # Parse off the event loop so other downloads keep progressing
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, parse_website_content, content)
+    except asyncio.TimeoutError:
         print(f"[WARNING] Timeout scraping: {url}")
         return ""
-    except requests.exceptions.RequestException as e:
+    except aiohttp.ClientError as e:
         print(f"[WARNING] Error scraping {url}: {e}")
         return ""
     except Exception as e:
         print(f"[WARNING] Unexpected error scraping {url}: {e}")
         return ""
 
+async def scrape_all(urls):
+    """Scrape many websites concurrently, returning content in input order"""
+    sem = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+    limiter = HostRateLimiter(rate=SCRAPE_RATE_PER_HOST)
+    connector = aiohttp.TCPConnector(limit=64, limit_per_host=4)
+    
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def bounded_scrape(url):
+            async with sem:
+                return await scrape_website_content(session, url, limiter)
+        
+        results = await asyncio.gather(*[bounded_scrape(url) for url in urls],
+                                       return_exceptions=True)
+    
+    return [r if isinstance(r, str) else "" for r in results]
+
 def load_existing_data():
     """Load existing data with validation"""
+    if os.path.exists(jsonl_path):
+        data = []
+        with open(jsonl_path, "rb") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    data.append(orjson.loads(line))
+                except orjson.JSONDecodeError as e:
+                    # Typically a partial last line left by an interrupted run
+                    print(f"[WARNING] Skipping malformed line {line_no} in '{jsonl_path}': {e}")
+        print(f"[INFO] Loaded {len(data)} existing restaurants")
+        return data
+    
+    # Fall back to the consolidated JSON written by older runs
     if not os.path.exists(json_path):
         return []
     
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(json_path, "rb") as f:
+            data = orjson.loads(f.read())
             if not isinstance(data, list):
                 print("[WARNING] Invalid data format, starting fresh")
                 return []
             print(f"[INFO] Loaded {len(data)} existing restaurants")
             return data
-    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+    except orjson.JSONDecodeError as e:
         print(f"[ERROR] Failed to load existing data: {e}")
         return []
 
+def open_jsonl_append():
+    """Open the JSONL log for appending, terminating a partial last line first"""
+    f = open(jsonl_path, "ab")
+    if f.tell() > 0:
+        with open(jsonl_path, "rb") as existing:
+            existing.seek(-1, os.SEEK_END)
+            if existing.read(1) != b"\n":
+                f.write(b"\n")
+    return f
+
+def append_restaurant(f, restaurant):
+    """Append one restaurant to the JSONL log and flush it to disk"""
+    f.write(orjson.dumps(restaurant, option=orjson.OPT_APPEND_NEWLINE))
+    f.flush()
+
+def data_digest(restaurants):
+    """Content hash of the dataset, used to skip rewrites when nothing changed"""
+    return hashlib.blake2b(orjson.dumps(restaurants, option=orjson.OPT_SORT_KEYS)).digest()
+
+def save_all_data(restaurants):
+    """Rewrite the JSONL log and the consolidated JSON with the full dataset"""
+    # Write to temp files and swap them in, so an interrupted rewrite never truncates the log
+    with open(jsonl_path + ".tmp", "wb") as f:
+        for restaurant in restaurants:
+            f.write(orjson.dumps(restaurant, option=orjson.OPT_APPEND_NEWLINE))
+    with open(json_path + ".tmp", "wb") as f:
+        f.write(orjson.dumps(restaurants, option=orjson.OPT_INDENT_2))
+    os.replace(jsonl_path + ".tmp", jsonl_path)
+    os.replace(json_path + ".tmp", json_path)
+
+class ParquetBatchWriter:
+    """Stream restaurants to Parquet in fixed-size RecordBatches.
+
+    Export errors are reported and the partial file discarded; they never stop the run.
+    """
+    def __init__(self, path, batch_size=PARQUET_BATCH_SIZE):
+        self.path = path
+        self.tmp_path = path + ".tmp"  # only replaces the real file once complete
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._pending = []
+        try:
+            self._writer = pq.ParquetWriter(self.tmp_path, RESTAURANT_SCHEMA, compression='zstd')
+        except Exception as e:
+            self._writer = None
+            self._fail(e)
+
+    def add(self, row):
+        if self._writer is None:
+            return
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._writer is None or not self._pending:
+            return
+        try:
+            self._writer.write_batch(pa.RecordBatch.from_pylist(self._pending, schema=RESTAURANT_SCHEMA))
+            self.rows_written += len(self._pending)
+            self._pending = []
+        except Exception as e:
+            self._fail(e)
+
+    def close(self):
+        """Flush remaining rows and move the finished file into place; returns True on success"""
+        self.flush()
+        if self._writer is None:
+            return False
+        try:
+            self._writer.close()
+            self._writer = None
+            os.replace(self.tmp_path, self.path)
+            return True
+        except Exception as e:
+            self._fail(e)
+            return False
+
+    def discard(self):
+        """Close the writer and remove the partial temp file"""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+            self._writer = None
+        self._pending = []
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def _fail(self, error):
+        print(f"[ERROR] Failed to save Parquet: {error}")
+        self.discard()
+
 def load_state():
     if os.path.exists(state_path):
-        with open(state_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(state_path, "rb") as f:
+            return orjson.loads(f.read())
     return {"start_index": 1, "scraped_urls": []}
 
 def save_state(state):
@@ -250,95 +556,133 @@ def save_state(state):
         raise ValueError("State must be a dictionary")
     
     try:
-        with open(state_path, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=4)
+        with open(state_path, "wb") as f:
+            f.write(orjson.dumps(state, option=orjson.OPT_INDENT_2))
     except Exception as e:
         print(f"[ERROR] Failed to save state: {e}")
 
 def update_missing_contacts():
     restaurants = load_existing_data()
+    original_digest = data_digest(restaurants)
     updated_count = 0
     missing_restaurants = []
     
-    # First try web scraping
-    for restaurant in restaurants:
-        if restaurant['email'] == '-':
-            print(f"\n[UPDATE] Checking {restaurant['name']}...")
-            website_content = scrape_website_content(restaurant['website'])
-            if website_content:
-                emails = extract_emails(website_content)
-                phones = extract_phones(website_content)
-                
-                if emails != ['-']:
-                    restaurant['email'] = ', '.join(emails)
-                    updated_count += 1
-                    print(f"[FOUND] Email: {restaurant['email']}")
-                
-                if restaurant['phone'] == '-' and phones != ['-']:
-                    restaurant['phone'] = ', '.join(phones)
-                    print(f"[FOUND] Phone: {restaurant['phone']}")
+    # First try web scraping, all missing-email sites in one concurrent batch
+    pending = [r for r in restaurants if r['email'] == '-']
+    contents = asyncio.run(scrape_all([r['website'] for r in pending])) if pending else []
+    
+    for restaurant, website_content in zip(pending, contents):
+        print(f"\n[UPDATE] Checking {restaurant['name']}...")
+        if website_content:
+            emails, phones = extract_contacts(website_content)
             
-            # Still missing? Add to Gemini list
-            if restaurant['email'] == '-':
-                missing_restaurants.append(restaurant)
+            if emails != ['-']:
+                restaurant['email'] = ', '.join(emails)
+                updated_count += 1
+                print(f"[FOUND] Email: {restaurant['email']}")
             
-            time.sleep(1)
+            if restaurant['phone'] == '-' and phones != ['-']:
+                restaurant['phone'] = ', '.join(phones)
+                print(f"[FOUND] Phone: {restaurant['phone']}")
+        
+        # Still missing? Add to Gemini list
+        if restaurant['email'] == '-':
+            missing_restaurants.append(restaurant)
     
     # Try Gemini for remaining missing contacts
     if missing_restaurants and GEMINI_API_KEY:
         print(f"\n[GEMINI] Trying to find {len(missing_restaurants)} missing contacts...")
         gemini_results = gemini_fallback_bulk(missing_restaurants)
         
-        for result in gemini_results:
-            for restaurant in restaurants:
-                if restaurant['name'] == result['name'] and result.get('email', '-') != '-':
-                    restaurant['email'] = result['email']
-                    updated_count += 1
-                    print(f"[GEMINI FOUND] {restaurant['name']}: {result['email']}")
-    
-    if updated_count > 0:
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(restaurants, f, indent=4)
+        # Results come back in input order; update those same dicts (shared with
+        # `restaurants`) so restaurants that happen to share a name are not overwritten
+        for restaurant, result in zip(missing_restaurants, gemini_results):
+            if result['website'] != restaurant['website'] or result.get('email', '-') == '-':
+                continue
+            restaurant['email'] = result['email']
+            if result.get('phone', '-') != '-':
+                restaurant['phone'] = result['phone']
+            updated_count += 1
+            print(f"[GEMINI FOUND] {restaurant['name']}: {result['email']}")
+    
+    # Phone-only finds also change the data, so compare content rather than the counter
+    if data_digest(restaurants) != original_digest:
+        save_all_data(restaurants)
         print(f"\n[SUCCESS] Updated {updated_count} restaurants with missing emails")
     else:
         print("\n[INFO] No missing emails found to update")
 
+def gemini_empty_result(restaurant):
+    return {"name": restaurant['name'], "website": restaurant['website'], "email": "-", "phone": "-"}
+
+async def gemini_fallback_batch(model, batch, sem, limiter):
+    """Ask Gemini for one batch of restaurants, backing off on rate limits"""
+    restaurants_text = "\n".join([f"{r['name']} - {r['website']}" for r in batch])
+    prompt = f"Find contact emails for these Singapore restaurants:\n{restaurants_text}\n\nReturn exactly one line per restaurant, in the same order, containing only a valid email address. If not found, return '-' for that restaurant."
+    
+    async with sem:
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            await limiter.acquire("gemini")
+            try:
+                response = await model.generate_content_async(prompt)
+                break
+            except GEMINI_RETRYABLE_ERRORS as e:
+                if attempt == GEMINI_MAX_RETRIES:
+                    raise
+                delay = 2 ** attempt
+                print(f"[GEMINI] {type(e).__name__}, retrying in {delay}s")
+                await asyncio.sleep(delay)
+    
+    text = response.text
+    print(f"[GEMINI] Response: {text[:200]}...")
+    
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) == len(batch):
+        emails = [extract_emails(line)[0] for line in lines]
+    else:
+        # Unexpected layout: assign whatever emails were found in order
+        found = extract_emails(text)
+        emails = (found if found != ["-"] else []) + ["-"] * len(batch)
+    
+    results = []
+    for r, email in zip(batch, emails):
+        if email != "-":
+            print(f"[GEMINI] Found email for {r['name']}: {email}")
+        results.append({"name": r['name'], "website": r['website'], "email": email, "phone": "-"})
+    return results
+
+async def gemini_fallback_all(missing_restaurants):
+    """Send all missing restaurants to Gemini in concurrent, rate-capped batches"""
+    model = genai.GenerativeModel("gemini-1.5-flash")
+    sem = asyncio.Semaphore(GEMINI_CONCURRENCY)
+    limiter = HostRateLimiter(rate=GEMINI_REQUESTS_PER_MINUTE / 60, burst=GEMINI_CONCURRENCY)
+    batches = [missing_restaurants[i:i + GEMINI_BATCH_SIZE]
+               for i in range(0, len(missing_restaurants), GEMINI_BATCH_SIZE)]
+    
+    print(f"[GEMINI] Sending {len(batches)} requests for {len(missing_restaurants)} restaurants...")
+    outcomes = await asyncio.gather(*[gemini_fallback_batch(model, batch, sem, limiter) for batch in batches],
+                                    return_exceptions=True)
+    
+    results = []
+    for batch, outcome in zip(batches, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"[GEMINI ERROR] {outcome}")
+            outcome = [gemini_empty_result(r) for r in batch]
+        results.extend(outcome)
+    return results
+
 def gemini_fallback_bulk(missing_restaurants):
     """Use Gemini API to find missing contact info"""
     if not missing_restaurants or not GEMINI_API_KEY:
         print("[GEMINI] No API key or restaurants provided")
-        return [{"name": r['name'], "website": r['website'], "email": "-", "phone": "-"} for r in missing_restaurants]
+        return [gemini_empty_result(r) for r in missing_restaurants]
     
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        restaurants_text = "\n".join([f"{r['name']} - {r['website']}" for r in missing_restaurants[:3]])
-        prompt = f"Find contact emails for these Singapore restaurants:\n{restaurants_text}\n\nReturn only valid email addresses, one per line. If not found, return '-' for that restaurant."
-        
-        print(f"[GEMINI] Sending request for {len(missing_restaurants[:3])} restaurants...")
-        
-        response = model.generate_content(prompt)
-        text = response.text
-        print(f"[GEMINI] Response: {text[:200]}...")
-        
-        # Extract emails from response
-        emails = extract_emails(text)
-        if emails != ["-"]:
-            print(f"[GEMINI] Found emails: {emails}")
-            # Assign emails to restaurants
-            results = []
-            email_idx = 0
-            for r in missing_restaurants[:3]:
-                if email_idx < len(emails) and emails[email_idx] != "-":
-                    results.append({"name": r['name'], "website": r['website'], "email": emails[email_idx], "phone": "-"})
-                    email_idx += 1
-                else:
-                    results.append({"name": r['name'], "website": r['website'], "email": "-", "phone": "-"})
-            return results
-            
+        return asyncio.run(gemini_fallback_all(missing_restaurants))
     except Exception as e:
         print(f"[GEMINI ERROR] {e}")
     
-    return [{"name": r['name'], "website": r['website'], "email": "-", "phone": "-"} for r in missing_restaurants]
+    return [gemini_empty_result(r) for r in missing_restaurants]
 
 # ========================
 # MAIN
@@ -351,17 +695,31 @@ def main():
         
         all_restaurants = load_existing_data()
         state = load_state()
+        # Websites already stored count as scraped too, keeping all_restaurants unique by website
+        scraped_set = set(state['scraped_urls']).union(r['website'] for r in all_restaurants)
+        
+        # Seed the append-only log from a JSON store written by older runs
+        if all_restaurants and not os.path.exists(jsonl_path):
+            save_all_data(all_restaurants)
         
         print(f"[INFO] Starting from result #{state['start_index']}")
         print(f"[INFO] Trying search query: '{QUERY}'")
-        results = fetch_cse_results(QUERY, start=state['start_index'])
+        pages = asyncio.run(fetch_cse_pages(QUERY, start=state['start_index']))
+        results = [item for page in pages if page for item in page]
+        
+        # Only advance past pages that came back (even empty), so a failed page is retried next run
+        pages_fetched = next((i for i, page in enumerate(pages) if page is None), len(pages))
         
         if not results:
             print("[WARNING] No results found")
+            if pages_fetched:
+                state['start_index'] += NUM_RESULTS * pages_fetched
+                save_state(state)
             return
         
         print(f"[SUCCESS] {len(results)} results retrieved for query: '{QUERY}'")
         new_count = 0
+        candidates = []
         
         for idx, item in enumerate(results, start=state['start_index']):
             if not isinstance(item, dict):
@@ -378,92 +736,88 @@ def main():
                 continue
             
             # Skip if already scraped
-            if link in state['scraped_urls']:
+            if link in scraped_set:
                 print(f"[SKIP {idx}] Already scraped: {title}")
                 continue
             
-            emails = extract_emails(snippet)
-            phones = extract_phones(snippet)
-            
-            # If email missing, scrape website
-            if emails == ["-"]:
-                print(f"[INFO] Scraping website for missing email: {link}")
-                website_content = scrape_website_content(link)
-                if website_content:
-                    website_emails = extract_emails(website_content)
-                    if website_emails != ["-"]:
-                        emails = website_emails
-                        print(f"[FOUND] Email from website: {', '.join(emails)}")
-                time.sleep(1)  # Be respectful to servers
-            
-            restaurant_data = {
-                "name": clean_name(title, link),
-                "website": link,
-                "email": clean_email(", ".join(emails)),
-                "phone": clean_phone(", ".join(phones))
-            }
-            all_restaurants.append(restaurant_data)
-            state['scraped_urls'].append(link)
-            new_count += 1
+            scraped_set.add(link)
+            emails, phones = extract_contacts(snippet)
+            candidates.append((idx, title, link, emails, phones))
+        
+        # If email missing, scrape websites concurrently
+        to_scrape = [link for _, _, link, emails, _ in candidates if emails == ["-"]]
+        scraped = {}
+        if to_scrape:
+            print(f"[INFO] Scraping {len(to_scrape)} websites for missing emails...")
+            scraped = dict(zip(to_scrape, asyncio.run(scrape_all(to_scrape))))
+        
+        # Stream the Parquet export alongside ingestion, existing rows first
+        parquet_writer = ParquetBatchWriter(parquet_path)
+        try:
+            for restaurant in all_restaurants:
+                parquet_writer.add(restaurant)
             
-            # Log each result
-            print(f"\n[NEW {idx}]")
-            print(f"Title: {title}")
-            print(f"Link: {link}")
-            print(f"Emails: {restaurant_data['email']}")
-            print(f"Phones: {restaurant_data['phone']}")
+            with open_jsonl_append() as jsonl_f:
+                for idx, title, link, emails, phones in candidates:
+                    website_content = scraped.get(link)
+                    if website_content:
+                        website_emails = extract_emails(website_content)
+                        if website_emails != ["-"]:
+                            emails = website_emails
+                            print(f"[FOUND] Email from website: {', '.join(emails)}")
+                    
+                    restaurant_data = {
+                        "name": clean_name(title, link),
+                        "website": link,
+                        "email": clean_email(", ".join(emails)),
+                        "phone": clean_phone(", ".join(phones))
+                    }
+                    all_restaurants.append(restaurant_data)
+                    append_restaurant(jsonl_f, restaurant_data)
+                    parquet_writer.add(restaurant_data)
+                    state['scraped_urls'].append(link)
+                    new_count += 1
+                    
+                    # Log each result
+                    print(f"\n[NEW {idx}]")
+                    print(f"Title: {title}")
+                    print(f"Link: {link}")
+                    print(f"Emails: {restaurant_data['email']}")
+                    print(f"Phones: {restaurant_data['phone']}")
+        except Exception:
+            parquet_writer.discard()
+            raise
         
         # Update state & save
-        state['start_index'] += NUM_RESULTS
+        state['start_index'] += NUM_RESULTS * pages_fetched
         save_state(state)
         
-        # Save data
+        if parquet_writer.close():
+            print(f"\n[SUCCESS] Data exported to Parquet: '{parquet_path}'")
+            print(f"[INFO] Total restaurants exported: {parquet_writer.rows_written}")
+        
+        # Save consolidated JSON (the JSONL log is already up to date)
         try:
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(all_restaurants, f, indent=4)
+            with open(json_path, "wb") as f:
+                f.write(orjson.dumps(all_restaurants, option=orjson.OPT_INDENT_2))
             print(f"\n[SUCCESS] {new_count} new restaurants added. Total: {len(all_restaurants)}")
             print(f"[SUCCESS] Restaurant data saved as JSON: '{json_path}'")
         except Exception as e:
             print(f"[ERROR] Failed to save JSON: {e}")
             return
         
-        # Save to Excel
-        try:
-            df = pd.DataFrame(all_restaurants)
-            df = df.drop_duplicates(subset=['website'], keep='first')
-            df.to_excel(excel_path, index=False)
-            print(f"[SUCCESS] Data exported to Excel: '{excel_path}'")
-            print(f"[INFO] Total unique restaurants: {len(df)}")
-        except Exception as e:
-            print(f"[ERROR] Failed to save Excel: {e}")
+        if EXPORT_EXCEL:
+            try:
+                pd.DataFrame(all_restaurants).to_excel(excel_path, index=False)
+                print(f"[SUCCESS] Data exported to Excel: '{excel_path}'")
+            except Exception as e:
+                print(f"[ERROR] Failed to save Excel: {e}")
         
         # Auto-update missing contacts
         try:
+            # Website scraping first, then one Gemini pass for whatever is still missing
             print("\n[AUTO] Updating missing emails from existing data...")
             update_missing_contacts()
-            
-            print("\n[AUTO] Using Gemini AI for remaining missing contacts...")
-            restaurants = load_existing_data()
-            missing = [r for r in restaurants if r['email'] == '-']
-            if missing:
-                print(f"[INFO] Found {len(missing)} restaurants with missing emails")
-                gemini_results = gemini_fallback_bulk(missing)
-                
-                updated = 0
-                for result in gemini_results:
-                    for restaurant in restaurants:
-                        if restaurant['name'] == result['name'] and result.get('email', '-') != '-':
-                            restaurant['email'] = result['email']
-                            if result.get('phone', '-') != '-':
-                                restaurant['phone'] = result['phone']
-                            updated += 1
-                
-                if updated > 0:
-                    with open(json_path, "w", encoding="utf-8") as f:
-                        json.dump(restaurants, f, indent=4)
-                    print(f"[SUCCESS] Gemini updated {updated} restaurants")
-            else:
-                print("[INFO] No missing contacts to update")
         except Exception as e:
             print(f"[ERROR] Unexpected error: {e}")
     